@@ -0,0 +1,55 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 20 # number of fresh interpreters measured.
+
+# run in a fresh interpreter: prints the time taken to import the game modules, then to construct a Board.
+PROBE = """
+import time
+start = time.perf_counter()
+import board, game, search
+imported = time.perf_counter()
+board.Board()
+constructed = time.perf_counter()
+print(imported - start, constructed - imported)
+"""
+
+# returns the zobrist key of a new board, used as a minimal worker task.
+def _task(_):
+    from board import Board
+    from enumerations import Colour
+    return Board().zobrist_key(Colour.WHITE)
+
+# returns True if the worker running it started with its tables built, before running any task.
+def _is_warm(_):
+    from workers import is_warm
+    return is_warm()
+
+# measures import plus Board() construction time in fresh interpreters, and the time for a
+# worker pool to start and complete its first tasks.
+def main():
+    imports = []
+    constructions = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        imported, constructed = output.split()
+        imports.append(float(imported))
+        constructions.append(float(constructed))
+    print("import:   {:.2f} ms median".format(statistics.median(imports) * 1000))
+    print("Board():  {:.2f} ms median".format(statistics.median(constructions) * 1000))
+
+    from workers import create_pool
+    start = time.perf_counter()
+    with create_pool(2) as pool:
+        pool.map(_task, range(8))
+    print("pool:     {:.2f} ms to start 2 workers and run 8 tasks".format((time.perf_counter() - start) * 1000))
+    with create_pool(2) as pool:
+        warm = all(pool.map(_is_warm, range(2), chunksize=1))
+    print("workers:  {}".format("start warmed" if warm else "NOT warmed"))
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,47 @@
 from pieces import Piece, PieceFactory, King, Queen, Bishop, Knight, Rook, Pawn
 from move import ChessPosition, MoveCommand
-from enumerations import Colour, PieceType, INITIAL_PIECE_SET_SINGLE
+from enumerations import Colour, PieceType, INITIAL_PIECE_SET_SINGLE, PIECE_VALUES
+from history import History, pack_move, unpack_move, pack_undo, unpack_undo, square_index, square_position, NO_SQUARE
 from copy import deepcopy
-from collections import deque
+from array import array
+import zobrist
 
 class Board:
-    def __init__(self):
+    # max_plies bounds the number of moves kept for undo, and checkpoint_interval is the number of
+    # plies between the snapshots used to seek through them.
+    def __init__(self, pieces_setup: list = INITIAL_PIECE_SET_SINGLE, max_plies: int = None, checkpoint_interval: int = 32):
         self._pieces = [] # array of pieces on the board
-        self._move_stack = deque() # stack of moves played on the board.
+        self._history = History(max_plies, checkpoint_interval) # moves played on the board, packed for undo and redo.
         self._size = 8 # width and height of the board.
         self._white_king_position = None # position of white king.
         self._black_king_position = None # position of black king.
         self._enpassant = None # position of piece to be captured by enpassant, if there is one.
         self._promote = None # position of pawn to be promoted if there is one.
-        self._initialize_pieces(INITIAL_PIECE_SET_SINGLE)
+        self._initialize_pieces(pieces_setup)
 
     # initializes pieces to represent a standard chess game.
+    # pieces_setup holds white's pieces, black's are mirrored onto the opposite side.
     def _initialize_pieces(self, pieces_setup: list):
         for piece_tuple in pieces_setup:
             type = piece_tuple[0]
             x = piece_tuple[1]
             y = piece_tuple[2]
 
-            piece_white = PieceFactory.create(type, ChessPosition(x, y), Colour.WHITE)
-            if type == PieceType.KING:
-                piece_white.set_board_handle(self)
-            if type == PieceType.PAWN:
-                piece_white.set_board_handle(self)
-            self._pieces.append(piece_white)
+            self.add_piece(type, ChessPosition(x, y), Colour.WHITE)
+            self.add_piece(type, ChessPosition(x, self._size - y - 1), Colour.BLACK)
 
-            piece_black = PieceFactory.create(type, ChessPosition(x, self._size - y - 1), Colour.BLACK)
-            if type == PieceType.KING:
-                piece_black.set_board_handle(self)
-            if type == PieceType.PAWN:
-                piece_black.set_board_handle(self)
-            self._pieces.append(piece_black)
+    # places a new piece of type and colour at position, for setting up arbitrary positions.
+    # if moved is True the piece is marked as having moved, so it can no longer castle or double step.
+    def add_piece(self, type: PieceType, position: ChessPosition, colour: Colour, moved=False):
+        piece = PieceFactory.create(type, position, colour)
+        if type == PieceType.KING:
+            piece.set_board_handle(self)
+        if type == PieceType.PAWN:
+            piece.set_board_handle(self)
+        if moved:
+            piece.restore(position, moved)
+        self._pieces.append(piece)
+        return piece
 
     # returns piece at position if there is one. returns None otherwise.
     def get_piece(self, position: ChessPosition):
@@ -44,9 +51,15 @@ class Board:
         return None
 
     # executes the move command.
-    # registers the move in the move stack if register is True.
+    # registers the move in the history if register is True. A registered move leaving a pawn to be promoted
+    # is marked as awaiting its promotion piece, which promote then records.
     def execute_move(self, command: MoveCommand, register=True):
         src_piece = self.get_piece(command.src)
+        self._history.clear_pending()
+        if register:
+            if self._history.needs_checkpoint():
+                self._history.checkpoint(self.snapshot())
+            undo = self._undo_information(src_piece, command)
         for i, piece in enumerate(self._pieces):
             if piece.position == command.dst:
                 del self._pieces[i]
@@ -61,7 +74,93 @@ class Board:
         self._enpassant = None
         src_piece.move(command.dst)
         if register:
-            self._move_stack.append(command)
+            self._history.push(pack_move(square_index(command.src), square_index(command.dst)), undo, self._promote is not None)
+
+    # returns the packed information needed to undo piece's move command.
+    def _undo_information(self, piece: Piece, command: MoveCommand):
+        enpassant = NO_SQUARE if self._enpassant is None else square_index(self._enpassant) + 1
+        moved = getattr(piece, "moved", False)
+        captured = self.captured_piece(piece, command.dst)
+        if captured is None:
+            return pack_undo(moved, 0, 0, False, enpassant)
+        return pack_undo(moved, captured.piece_type.value + 1, square_index(captured.position),
+                         getattr(captured, "moved", False), enpassant)
+
+    # undoes the last move registered in the history. returns False if there is none.
+    def undo(self):
+        entry = self._history.back()
+        if entry is None:
+            return False
+        src, dst, promotion = unpack_move(entry[0])
+        moved, captured, captured_square, captured_moved, enpassant = unpack_undo(entry[1])
+
+        piece = self.get_piece(square_position(dst))
+        if promotion:
+            self._pieces.remove(piece)
+            piece = self.add_piece(PieceType.PAWN, square_position(src), piece.colour, moved)
+        elif isinstance(piece, King) and abs(src % 8 - dst % 8) == 2: # castled, so put the rook back.
+            rook = self.get_piece(ChessPosition(3 if dst % 8 == 2 else 5, dst // 8))
+            rook.restore(ChessPosition(0 if dst % 8 == 2 else 7, dst // 8), False)
+        piece.restore(square_position(src), moved)
+
+        if captured:
+            opp_colour = Colour.BLACK if piece.colour == Colour.WHITE else Colour.WHITE
+            self.add_piece(PieceType(captured - 1), square_position(captured_square), opp_colour, captured_moved)
+        self._enpassant = None if enpassant == NO_SQUARE else square_position(enpassant - 1)
+        self._promote = None
+        return True
+
+    # replays the last move undone. returns False if there is none.
+    def redo(self):
+        move = self._history.next_move()
+        if move is None:
+            return False
+        src, dst, promotion = unpack_move(move)
+        self.execute_move(MoveCommand(square_position(src), square_position(dst)))
+        if promotion:
+            self.promote(PieceType(promotion - 1))
+        return True
+
+    # sets the board to the position after ply moves, by undoing or redoing moves, or from the nearest
+    # checkpoint if that takes fewer moves. returns False if ply is not held in the history.
+    def seek(self, ply: int):
+        if ply < self._history.first_ply or ply > self._history.last_ply:
+            return False
+        checkpoint = self._history.checkpoint_before(ply)
+        if checkpoint is not None and ply - checkpoint[0] < abs(ply - self._history.ply):
+            self.restore_snapshot(checkpoint[1])
+            self._history.rewind(checkpoint[0])
+        while self._history.ply > ply:
+            self.undo()
+        while self._history.ply < ply:
+            self.redo()
+        return True
+
+    # returns the number of moves played to reach the position on the board.
+    @property
+    def ply(self):
+        return self._history.ply
+
+    # returns the position packed into bytes: the en passant square, then square, type, colour and
+    # moved state of every piece.
+    def snapshot(self):
+        data = array("H", [NO_SQUARE if self._enpassant is None else square_index(self._enpassant) + 1])
+        for piece in self._pieces:
+            moved = getattr(piece, "moved", False)
+            data.append(square_index(piece.position) | piece.piece_type.value << 6 | piece.colour.value << 9 | int(moved) << 10)
+        return data.tobytes()
+
+    # sets the position to one packed by snapshot. The history is left unchanged.
+    def restore_snapshot(self, snapshot: bytes):
+        data = array("H")
+        data.frombytes(snapshot)
+        self._pieces = []
+        self._white_king_position = None
+        self._black_king_position = None
+        self._promote = None
+        self._enpassant = None if data[0] == NO_SQUARE else square_position(data[0] - 1)
+        for value in data[1:]:
+            self.add_piece(PieceType(value >> 6 & 0x7), square_position(value & 0x3F), Colour(value >> 9 & 1), bool(value >> 10 & 1))
 
     # castles rook.
     # requires: king has been moved to a valid castling square, and castling is available.
@@ -90,6 +189,7 @@ class Board:
                 self.execute_move(move, register=False)
 
     # promotes pawn to be promted to type.
+    # the promotion is recorded in the history if the pawn's move was registered.
     # requires: self._promote is not None.
     def promote(self, type: PieceType):
         position = self._promote
@@ -104,6 +204,7 @@ class Board:
                 break
 
         self._pieces.append(new_piece)
+        self._history.set_promotion(type.value + 1)
 
     # returns ChessPosition which is a result of a move from src by increment_x and increment_y
     # if this is a valid move given the current board state. Otherwise returns None.
@@ -132,11 +233,10 @@ class Board:
                 return end_position
         return end_position if not pawn_take else None
 
-    # returns array of ChessPositions which are the result of a move from src in the direction
+    # yields ChessPositions which are the result of a move from src in the direction
     # [increment_x, increment_y] if this is a valid move given the current board state.
     def direction_search(self, src: ChessPosition, colour: Colour, increment_x, increment_y):
-        positions = []
-        if abs(increment_x)+abs(increment_y)==0: return positions
+        if abs(increment_x)+abs(increment_y)==0: return
         curr_x = src.x_coord
         curr_y = src.y_coord
         curr_x += increment_x
@@ -146,12 +246,11 @@ class Board:
             curr_piece = self.get_piece(curr_position)
             if curr_piece is not None:
                 if curr_piece.colour != colour:
-                    positions.append(curr_position)
+                    yield curr_position
                 break
-            positions.append(curr_position)
+            yield curr_position
             curr_x += increment_x
             curr_y += increment_y
-        return positions
 
     # returns ChessPosition which is the result of a king move from src in the direction
     # [increment_x, increment_y] if it is a valid castling move given the current board state.
@@ -176,6 +275,8 @@ class Board:
                 return None
             curr_x += increment_x
             curr_y += increment_y
+        else: # reached the edge of the board without finding an unmoved rook.
+            return None
 
         #checks if king in check on any of moving squares
         if src_piece.colour == Colour.WHITE:
@@ -201,34 +302,128 @@ class Board:
         copy = deepcopy(self)
         colour = copy.get_piece(move.src).colour
         copy.execute_move(move, register=False) # do I need register field?
-        for piece in copy.pieces:
-            if colour == Colour.WHITE and copy._white_king_position in piece.valid_attacks(copy):
-                return True
-            elif colour == Colour.BLACK and copy._black_king_position in piece.valid_attacks(copy):
+        if colour == Colour.WHITE:
+            king_position = copy._white_king_position
+        else:
+            king_position = copy._black_king_position
+        for piece in copy._pieces:
+            if piece.colour != colour and king_position in piece.generate_attacks(copy):
                 return True
         return False
 
 
     # returns True if move results in a check on the king of opposite Colour to colour. False otherwise
     def check(self, colour: Colour):
-        for piece in self.pieces:
-            if colour == Colour.WHITE and self._black_king_position in piece.valid_attacks(self):
-                return True
-            elif colour == Colour.BLACK and self._white_king_position in piece.valid_attacks(self):
+        if colour == Colour.WHITE:
+            king_position = self._black_king_position
+        else:
+            king_position = self._white_king_position
+        for piece in list(self._pieces):
+            if piece.colour == colour and king_position in piece.generate_attacks(self):
                 return True
         return False
 
     # returns True if there are no valid moves for colour. False otherwise.
-    # TODO needs to be reworked because valid moves and attacks dont check for self check.
+    # stops at the first legal move found.
     def no_moves(self, colour: Colour):
-        moves = []
-        for piece in self.pieces:
-            if piece.colour == colour:
-                for dst in piece.valid_moves(self) + piece.valid_attacks(self):
-                    move = MoveCommand(piece.position, dst)
-                    if not self.self_check(move):
-                        moves.append(move)
-        return len(moves) == 0
+        return next(self.generate_moves(colour, legal=True), None) is None
+
+    # yields MoveCommands for colour in stages: the hash move if it is valid, captures ordered by
+    # victim value (least valuable attacker first), promotions, then quiet moves.
+    # each stage is only generated once the previous one is exhausted, so callers which stop early
+    # do not pay for the remaining stages. Moves resulting in self check are skipped if legal is True.
+    # the board must not be changed while the generator is in use.
+    def generate_moves(self, colour: Colour, hash_move: MoveCommand = None, legal=False):
+        if hash_move is not None and self._is_pseudo_legal(hash_move, colour):
+            if not legal or not self.self_check(hash_move):
+                yield hash_move
+        for stage in (self.generate_captures, self.generate_promotions, self.generate_quiets):
+            for move in stage(colour):
+                if hash_move is not None and move == hash_move:
+                    continue
+                if legal and self.self_check(move):
+                    continue
+                yield move
+
+    # yields capturing MoveCommands for colour, most valuable victim first.
+    # ties are broken by playing the least valuable attacker first.
+    def generate_captures(self, colour: Colour):
+        captures = []
+        for piece in list(self._pieces):
+            if piece.colour != colour:
+                continue
+            for dst in piece.generate_attacks(self):
+                victim = self.captured_piece(piece, dst)
+                if victim is not None:
+                    score = PIECE_VALUES[victim.piece_type] * 100 - PIECE_VALUES[piece.piece_type] // 100
+                    captures.append((score, MoveCommand(piece.position, dst)))
+        captures.sort(key=lambda capture: capture[0], reverse=True)
+        for capture in captures:
+            yield capture[1]
+
+    # yields non capturing pawn moves of colour to the last rank.
+    def generate_promotions(self, colour: Colour):
+        for piece in list(self._pieces):
+            if piece.colour != colour or not isinstance(piece, Pawn):
+                continue
+            for dst in piece.generate_moves(self):
+                if self._is_promotion(piece, dst) and self.captured_piece(piece, dst) is None:
+                    yield MoveCommand(piece.position, dst)
+
+    # yields non capturing, non promoting MoveCommands for colour.
+    def generate_quiets(self, colour: Colour):
+        for piece in list(self._pieces):
+            if piece.colour != colour:
+                continue
+            for dst in piece.generate_moves(self):
+                if self._is_promotion(piece, dst) or self.captured_piece(piece, dst) is not None:
+                    continue
+                yield MoveCommand(piece.position, dst)
+
+    # returns the piece captured if piece moves to dst, including en passant captures. returns None otherwise.
+    def captured_piece(self, piece: Piece, dst: ChessPosition):
+        victim = self.get_piece(dst)
+        if victim is not None:
+            return victim if victim.colour != piece.colour else None
+        if isinstance(piece, Pawn) and piece.position.x_coord != dst.x_coord and self._enpassant is not None:
+            return self.get_piece(self._enpassant)
+        return None
+
+    # returns True if piece moving to dst is a pawn reaching the last rank.
+    def _is_promotion(self, piece: Piece, dst: ChessPosition):
+        if not isinstance(piece, Pawn):
+            return False
+        return dst.y_coord == (self._size - 1 if piece.colour == Colour.WHITE else 0)
+
+    # returns True if move is a valid move for colour, ignoring self check.
+    def _is_pseudo_legal(self, move: MoveCommand, colour: Colour):
+        piece = self.get_piece(move.src)
+        if piece is None or piece.colour != colour:
+            return False
+        return move.dst in piece.generate_moves(self)
+
+    # returns list of colour's pieces attacking position.
+    def attackers(self, position: ChessPosition, colour: Colour):
+        return [piece for piece in self._pieces if piece.colour == colour and position in piece.generate_attacks(self)]
+
+    # returns the summed value of colour's pieces, excluding the king.
+    def material(self, colour: Colour):
+        return sum(PIECE_VALUES[piece.piece_type] for piece in self._pieces
+                   if piece.colour == colour and piece.piece_type != PieceType.KING)
+
+    # returns True if neither side has the material left to mate: kings alone, a king and a single
+    # bishop or knight against a king, or a king and bishop each with the bishops on squares of one colour.
+    def insufficient_material(self):
+        others = [piece for piece in self._pieces if piece.piece_type != PieceType.KING]
+        if len(others) == 0:
+            return True
+        if len(others) == 1:
+            return others[0].piece_type in (PieceType.BISHOP, PieceType.KNIGHT)
+        if len(others) == 2 and all(piece.piece_type == PieceType.BISHOP for piece in others):
+            first, second = others
+            return first.colour != second.colour and \
+                (first.position.x_coord + first.position.y_coord) % 2 == (second.position.x_coord + second.position.y_coord) % 2
+        return False
 
     # registers position of colour's King.
     def register_king_position(self, position: ChessPosition, colour: Colour):
@@ -247,6 +442,28 @@ class Board:
     def register_promote(self, position: ChessPosition):
         self._promote = position
 
+    # yields (type, colour, position) of every piece on the board without copying the pieces.
+    def placement(self):
+        for piece in self._pieces:
+            yield piece.piece_type, piece.colour, piece.position
+
+    # returns the Zobrist key of the position with colour to move.
+    def zobrist_key(self, colour: Colour):
+        keys = zobrist.keys()
+        key = 0
+        for piece in self._pieces:
+            key ^= keys[zobrist.piece_key_index(piece.piece_type, piece.colour, piece.position.x_coord, piece.position.y_coord)]
+            if piece.piece_type == PieceType.KING and not piece.moved:
+                for x in (0, self._size - 1):
+                    rook = self.get_piece(ChessPosition(x, piece.position.y_coord))
+                    if isinstance(rook, Rook) and rook.colour == piece.colour and not rook.moved:
+                        key ^= keys[zobrist.castling_key_index(piece.colour, x)]
+        if colour == Colour.BLACK:
+            key ^= keys[zobrist.SIDE_KEY]
+        if self._enpassant is not None:
+            key ^= keys[zobrist.ENPASSANT_KEYS + self._enpassant.x_coord]
+        return key
+
     # returns copy of self._pieces.
     @property
     def pieces(self):
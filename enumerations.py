@@ -12,6 +12,16 @@ class PieceType(Enum):
     QUEEN = 4
     KING = 5
 
+# material value of each piece type in centipawns. Used to order captures by victim value.
+PIECE_VALUES = {
+    PieceType.PAWN: 100,
+    PieceType.KNIGHT: 320,
+    PieceType.BISHOP: 330,
+    PieceType.ROOK: 500,
+    PieceType.QUEEN: 900,
+    PieceType.KING: 20000
+}
+
 class State(Enum):
     WHITE_MOVE = 0
     BLACK_MOVE = 1
@@ -20,6 +30,9 @@ class State(Enum):
     WHITE_CHECKMATE = 4
     BLACK_CHECKMATE = 5
     STALEMATE = 6
+    DRAW = 7 # adjudicated draw.
+    WHITE_WIN = 8 # adjudicated win for white.
+    BLACK_WIN = 9 # adjudicated win for black.
 
 INITIAL_PIECE_SET_SINGLE = [
     (PieceType.ROOK, 0, 0),
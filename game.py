@@ -3,12 +3,58 @@ from display import *
 from move import MoveCommand
 from enumerations import Colour, State, PieceType
 
+HISTORY_PLIES = 512 # number of moves kept for undo by default.
+
 class Game:
-    def __init__(self, display: Display = None):
+    # draw_after_plies is the number of plies after which the game is adjudicated a draw, if given.
+    # history_plies bounds the number of moves the board keeps for undo, or leaves it unbounded if None.
+    def __init__(self, display: Display = None, tablebase=None, draw_after_plies: int = None, history_plies: int = HISTORY_PLIES):
         self._finished = False
-        self._board = Board()
+        self._board = Board(max_plies=history_plies)
         self._display = display
         self._state = State.WHITE_MOVE
+        self._tablebase = tablebase # Tablebase used to adjudicate positions it covers, if given.
+        self._draw_after_plies = draw_after_plies
+        self._plies = 0 # number of plies played.
+        self._repetitions = {self._board.zobrist_key(Colour.WHITE): 1} # number of times each position occurred.
+
+    @property
+    def board(self):
+        return self._board
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def finished(self):
+        return self._finished
+
+    @property
+    def plies(self):
+        return self._plies
+
+    # returns the colour to move.
+    def colour_to_move(self):
+        if self._state == State.WHITE_MOVE or self._state == State.WHITE_IN_CHECK:
+            return Colour.WHITE
+        return Colour.BLACK
+
+    # plays command for the side to move without a display, promoting pawns to promotion, then updates state.
+    # returns True if command was played, False if it is not a valid move or the game is finished.
+    def play(self, command: MoveCommand, promotion: PieceType = PieceType.QUEEN):
+        if self._finished or command is None:
+            return False
+        src_piece = self._board.get_piece(command.src)
+        if src_piece is None or src_piece.colour != self.colour_to_move():
+            return False
+        if command.dst not in src_piece.generate_moves(self._board) or self._board.self_check(command):
+            return False
+        self._board.execute_move(command)
+        if self._board._promote is not None:
+            self._board.promote(promotion)
+        self.update_state()
+        return True
 
     # runs a chess game.
     def run(self):
@@ -38,8 +84,8 @@ class Game:
                 self._display.print_line("Invalid command. Please enter a valid command.")
                 continue
             # make sure it is to a movable/attackable position
-            if command.dst not in src_piece.valid_moves(self._board) and \
-                    command.dst not in src_piece.valid_attacks(self._board):
+            if command.dst not in src_piece.generate_moves(self._board) and \
+                    command.dst not in src_piece.generate_attacks(self._board):
                 self._display.print_line("Invalid command. Please enter a valid command.")
                 continue
             # make sure it does not result in self check
@@ -64,6 +110,12 @@ class Game:
             self._display.print_line("Black wins by checkmate.")
         elif self._state == State.STALEMATE:
             self._display.print_line("Stalemate. The game ends in a draw.")
+        elif self._state == State.DRAW:
+            self._display.print_line("The game is adjudicated a draw.")
+        elif self._state == State.WHITE_WIN:
+            self._display.print_line("White wins by adjudication.")
+        elif self._state == State.BLACK_WIN:
+            self._display.print_line("Black wins by adjudication.")
 
     def run_test(self):
         self._display.display(self._board.pieces)
@@ -96,8 +148,8 @@ class Game:
                 self._display.print_line("Invalid command. Please enter a valid command.")
                 continue
             # make sure it is to a movable/attackable position
-            if command.dst not in src_piece.valid_moves(self._board) and \
-                    command.dst not in src_piece.valid_attacks(self._board):
+            if command.dst not in src_piece.generate_moves(self._board) and \
+                    command.dst not in src_piece.generate_attacks(self._board):
                 self._display.print_line("Invalid command. Please enter a valid command.")
                 continue
             # make sure it does not result in self check
@@ -125,9 +177,16 @@ class Game:
             self._display.print_line("Black wins by checkmate.")
         elif self._state == State.STALEMATE:
             self._display.print_line("Stalemate. The game ends in a draw.")
+        elif self._state == State.DRAW:
+            self._display.print_line("The game is adjudicated a draw.")
+        elif self._state == State.WHITE_WIN:
+            self._display.print_line("White wins by adjudication.")
+        elif self._state == State.BLACK_WIN:
+            self._display.print_line("Black wins by adjudication.")
 
     # checks the state of the board and updates state accordingly.
     def update_state(self):
+        self._plies += 1
         if self._state == State.WHITE_MOVE or self._state == State.WHITE_IN_CHECK:
             check = self._board.check(Colour.WHITE)
             no_moves = self._board.no_moves(Colour.BLACK)
@@ -160,6 +219,34 @@ class Game:
                 else:
                     self._state = State.WHITE_MOVE
 
+        if not self._finished:
+            self._adjudicate()
+
+    # ends the game as a draw on threefold repetition, when neither side can mate, or once draw_after_plies have been played.
+    # otherwise ends the game if the position is covered by the tablebase, with the result it holds.
+    def _adjudicate(self):
+        colour = self.colour_to_move()
+        key = self._board.zobrist_key(colour)
+        self._repetitions[key] = self._repetitions.get(key, 0) + 1
+        if self._repetitions[key] >= 3 or self._board.insufficient_material() or (self._draw_after_plies is not None and self._plies >= self._draw_after_plies):
+            self._state = State.DRAW
+            self._finished = True
+            return
+
+        if self._tablebase is None:
+            return
+        probe = self._tablebase.probe(self._board, colour)
+        if probe is None:
+            return
+        result = probe[0]
+        if result == 0:
+            self._state = State.DRAW
+        elif (result == 1) == (colour == Colour.WHITE):
+            self._state = State.WHITE_WIN
+        else:
+            self._state = State.BLACK_WIN
+        self._finished = True
+
     # retrieves move command from stdin and returns a move command.
     def _parse_command(self):
         input_ = input()
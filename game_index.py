@@ -0,0 +1,273 @@
+from board import Board
+from move import MoveCommand
+from enumerations import Colour, PieceType
+from history import pack_move, unpack_move, square_index, square_position
+from workers import create_pool
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import heapq
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+RECORD = struct.Struct("<QIHH") # position key, game id, ply, next move packed by _encode.
+# magic, number of records, number of blocks, offset of the block directory, and the number below which
+# every segment is superseded by this one, as it holds their merged records.
+HEADER = struct.Struct("<8sQQQQ")
+DIRECTORY_ENTRY = struct.Struct("<QQI") # first position key, offset and compressed length of a block.
+MAGIC = b"CHESSIX3" # changed whenever the record format changes, so older segments are rejected.
+BLOCK_RECORDS = 4096 # number of records compressed together. A query decompresses about one block per segment.
+CHUNK_GAMES = 1000 # number of games replayed by a worker process at a time.
+NO_MOVE = 0xFFFF # next move of the final position of a game.
+
+# returns move packed as in the board history, see history.pack_move.
+def _encode(move: MoveCommand):
+    return pack_move(square_index(move.src), square_index(move.dst))
+
+# returns the MoveCommand packed into value by _encode, or None for NO_MOVE.
+def _decode(value: int):
+    if value == NO_MOVE:
+        return None
+    src, dst, _ = unpack_move(value)
+    return MoveCommand(square_position(src), square_position(dst))
+
+# returns the (game id, moves) of every game in the file at path.
+# each line holds an integer game id and the game's moves, separated by a tab, e.g. "12\te2 e4,e7 e5".
+def read_games(path: str):
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                game_id, moves = line.rstrip("\n").split("\t")
+                yield int(game_id), moves.split(",") if moves else []
+
+# yields (board, colour to move, next move) for every position of the game with moves, replayed from the
+# initial position on a single board. next move is None for the final position. Pawns reaching the last rank become queens.
+def replay(moves: list):
+    board = Board()
+    colour = Colour.WHITE
+    for string in moves:
+        move = MoveCommand.from_string(string)
+        yield board, colour, move
+        board.execute_move(move, register=False)
+        if board._promote is not None:
+            board.promote(PieceType.QUEEN)
+        colour = Colour.BLACK if colour == Colour.WHITE else Colour.WHITE
+    yield board, colour, None
+
+# replays every game in games, and writes a (position key, game id, ply, next move) record for every
+# position reached to the file at path, sorted.
+def _write_run(arguments):
+    games, path = arguments
+    records = []
+    for game_id, moves in games:
+        for ply, (board, colour, move) in enumerate(replay(moves)):
+            records.append((board.zobrist_key(colour), game_id, ply, NO_MOVE if move is None else _encode(move)))
+    records.sort()
+    with open(path, "wb") as file:
+        for record in records:
+            file.write(RECORD.pack(*record))
+    return path
+
+# yields the records of the sorted run file at path.
+def _read_run(path: str):
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(RECORD.size * BLOCK_RECORDS)
+            if not data:
+                break
+            yield from RECORD.iter_unpack(data)
+
+# writes the sorted records to a segment file at path.
+# segments numbered below supersedes are marked as merged into it.
+def _write_segment(path: str, records, supersedes: int = 0):
+    directory = []
+    count = 0
+    with open(path + ".tmp", "wb") as file:
+        file.write(HEADER.pack(MAGIC, 0, 0, 0, supersedes))
+        block = []
+        for record in records:
+            block.append(record)
+            if len(block) == BLOCK_RECORDS:
+                directory.append(_write_block(file, block))
+                count += len(block)
+                block = []
+        if len(block) > 0:
+            directory.append(_write_block(file, block))
+            count += len(block)
+        directory_offset = file.tell()
+        for entry in directory:
+            file.write(DIRECTORY_ENTRY.pack(*entry))
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, count, len(directory), directory_offset, supersedes))
+    os.replace(path + ".tmp", path)
+
+# writes block compressed to file. returns its directory entry.
+def _write_block(file, block: list):
+    data = zlib.compress(b"".join(RECORD.pack(*record) for record in block))
+    offset = file.tell()
+    file.write(data)
+    return block[0][0], offset, len(data)
+
+# returns the number of the segment at path.
+def _segment_number(path: str):
+    return int(os.path.basename(path)[:-len(".seg")])
+
+class _Segment:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, blocks, directory_offset, self.supersedes = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise RuntimeError("{} is not a game index segment".format(path))
+        self._directory = [DIRECTORY_ENTRY.unpack_from(self._map, directory_offset + i * DIRECTORY_ENTRY.size)
+                           for i in range(blocks)]
+        self._first_keys = array("Q", (entry[0] for entry in self._directory))
+
+    # returns the decompressed records of block i.
+    def _block(self, i: int):
+        _, offset, length = self._directory[i]
+        return zlib.decompress(self._map[offset:offset + length])
+
+    # yields the records with position key.
+    def lookup(self, key: int):
+        # records with key may start in the block before the first block starting with key.
+        i = max(bisect_left(self._first_keys, key) - 1, 0)
+        while i < len(self._directory) and self._first_keys[i] <= key:
+            data = self._block(i)
+            count = len(data) // RECORD.size
+            low = 0
+            high = count
+            while low < high:
+                middle = (low + high) // 2
+                if RECORD.unpack_from(data, middle * RECORD.size)[0] < key:
+                    low = middle + 1
+                else:
+                    high = middle
+            while low < count:
+                record = RECORD.unpack_from(data, low * RECORD.size)
+                if record[0] != key:
+                    return
+                yield record
+                low += 1
+            i += 1
+
+    # yields every record in the segment, sorted.
+    def records(self):
+        for i in range(len(self._directory)):
+            yield from RECORD.iter_unpack(self._block(i))
+
+    def close(self):
+        self._map.close()
+
+class GameIndex:
+    def __init__(self, directory: str):
+        self._directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._segments = [_Segment(os.path.join(directory, name)) for name in sorted(os.listdir(directory))
+                          if name.endswith(".seg")]
+        # segments left behind by an interrupted compaction are superseded by the merged one, and removed.
+        supersedes = max((segment.supersedes for segment in self._segments), default=0)
+        for segment in [segment for segment in self._segments if _segment_number(segment.path) < supersedes]:
+            segment.close()
+            os.remove(segment.path)
+            self._segments.remove(segment)
+
+    # indexes games, an iterable of (game id, moves), into a new segment.
+    # games are replayed in parallel across processes into sorted runs, which are then merged.
+    # existing segments are left untouched, so games can be added incrementally.
+    def add(self, games, processes: int = None):
+        path = self._new_segment_path()
+        tasks = []
+        chunk = []
+        for game in games:
+            chunk.append(game)
+            if len(chunk) == CHUNK_GAMES:
+                tasks.append((chunk, "{}.{}.run".format(path, len(tasks))))
+                chunk = []
+        if len(chunk) > 0:
+            tasks.append((chunk, "{}.{}.run".format(path, len(tasks))))
+        if len(tasks) == 0:
+            return
+
+        with create_pool(processes) as pool:
+            runs = list(pool.imap_unordered(_write_run, tasks))
+        _write_segment(path, heapq.merge(*[_read_run(run) for run in runs]))
+        for run in runs:
+            os.remove(run)
+        self._segments.append(_Segment(path))
+
+    # merges all segments into one, so queries read a single segment.
+    # the merged segment is numbered after the segments it merges and marked as superseding them. It is
+    # complete on disk before they are removed, and segments it supersedes which are still present after
+    # an interruption are ignored and removed when the index is next opened.
+    # requires: no other process adds segments to the directory meanwhile.
+    def compact(self):
+        if len(self._segments) < 2:
+            return
+        path = self._new_segment_path()
+        _write_segment(path, heapq.merge(*[segment.records() for segment in self._segments]), _segment_number(path))
+        for segment in self._segments:
+            segment.close()
+            os.remove(segment.path)
+        self._segments = [_Segment(path)]
+
+    # returns the path of a segment numbered after every existing one.
+    def _new_segment_path(self):
+        names = [name for name in os.listdir(self._directory) if name.endswith(".seg")]
+        number = max((_segment_number(name) for name in names), default=-1) + 1
+        return os.path.join(self._directory, "{:06d}.seg".format(number))
+
+    # returns the (game id, ply, next move) of every occurrence of the position with key, sorted by game id.
+    # next move is None if the game ended in the position.
+    def lookup(self, key: int):
+        occurrences = []
+        for segment in self._segments:
+            for _, game_id, ply, move in segment.lookup(key):
+                occurrences.append((game_id, ply, _decode(move)))
+        occurrences.sort(key=lambda occurrence: (occurrence[0], occurrence[1]))
+        return occurrences
+
+    # returns the ids of all games reaching the position on board with colour to move.
+    def games(self, board: Board, colour: Colour):
+        return sorted(set(occurrence[0] for occurrence in self.lookup(board.zobrist_key(colour))))
+
+    # returns up to limit (move, count) of the moves most commonly played from the position on board
+    # with colour to move.
+    def continuations(self, board: Board, colour: Colour, limit: int = 10):
+        counts = Counter()
+        for segment in self._segments:
+            for record in segment.lookup(board.zobrist_key(colour)):
+                if record[3] != NO_MOVE:
+                    counts[record[3]] += 1
+        return [(_decode(move), count) for move, count in counts.most_common(limit)]
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+# adds a games file to an index, or queries the position reached by a line of moves, e.g.
+# python game_index.py add games.idx games.txt
+# python game_index.py query games.idx "e2 e4,e7 e5"
+def main():
+    command, directory = sys.argv[1], sys.argv[2]
+    index = GameIndex(directory)
+    if command == "add":
+        index.add(read_games(sys.argv[3]))
+    elif command == "compact":
+        index.compact()
+    elif command == "query":
+        moves = sys.argv[3].split(",") if len(sys.argv) > 3 and sys.argv[3] else []
+        for board, colour, _ in replay(moves):
+            pass
+        print("{} games".format(len(index.games(board, colour))))
+        for move, count in index.continuations(board, colour):
+            print("{} {}".format(move, count))
+    index.close()
+
+if __name__ == "__main__":
+    main()
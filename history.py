@@ -0,0 +1,148 @@
+from move import ChessPosition
+from array import array
+
+# records the moves played on a board as packed integers, with the information needed to undo them.
+# plies are counted from the start of the game. Moves past the cursor have been undone and can be redone.
+# once more than max_plies moves are held, the oldest are dropped a checkpoint interval at a time,
+# so memory stays bounded however long the game runs.
+class History:
+    def __init__(self, max_plies: int = None, checkpoint_interval: int = 32):
+        self._moves = array("H") # packed moves, see pack_move.
+        self._undo = array("I") # packed undo information of each move, see pack_undo.
+        self._first = 0 # ply of the first move held.
+        self._cursor = 0 # ply of the position on the board.
+        self._max_plies = max_plies
+        self._checkpoint_interval = checkpoint_interval
+        self._checkpoints = {} # board snapshots by ply, taken every checkpoint_interval plies.
+        self._pending = None # ply of the move awaiting its promotion piece, if there is one.
+
+    @property
+    def ply(self):
+        return self._cursor
+
+    @property
+    def first_ply(self):
+        return self._first
+
+    @property
+    def last_ply(self):
+        return self._first + len(self._moves)
+
+    # returns True if a snapshot should be taken before a move is played from the current ply.
+    def needs_checkpoint(self):
+        return self._cursor % self._checkpoint_interval == 0 and self._cursor not in self._checkpoints
+
+    # stores snapshot as the position at the current ply.
+    def checkpoint(self, snapshot: bytes):
+        self._checkpoints[self._cursor] = snapshot
+
+    # returns (ply, snapshot) of the latest checkpoint at or before ply, or None if there is none.
+    def checkpoint_before(self, ply: int):
+        ply -= ply % self._checkpoint_interval
+        if ply in self._checkpoints:
+            return ply, self._checkpoints[ply]
+        return None
+
+    # records move played from the current ply with its undo information.
+    # moves which had been undone are kept if move is the next of them, and discarded otherwise.
+    # if promotion_pending is True the move is marked as awaiting its promotion piece, see set_promotion.
+    def push(self, move: int, undo: int, promotion_pending=False):
+        self._pending = self._cursor if promotion_pending else None
+        i = self._cursor - self._first
+        if i < len(self._moves) and self._moves[i] & MOVE_MASK == move & MOVE_MASK:
+            self._undo[i] = undo
+        else:
+            self._truncate(i)
+            self._moves.append(move)
+            self._undo.append(undo)
+        self._cursor += 1
+        if self._max_plies is not None and len(self._moves) >= self._max_plies + self._checkpoint_interval:
+            self._drop(self._checkpoint_interval)
+
+    # records promotion of the pawn moved by the last move played, if that move is awaiting its promotion piece.
+    # does nothing otherwise.
+    def set_promotion(self, promotion: int):
+        if self._pending is None or self._pending != self._cursor - 1:
+            return
+        i = self._pending - self._first
+        self._pending = None
+        move = (self._moves[i] & MOVE_MASK) | promotion << 12
+        if move != self._moves[i]:
+            # the checkpoint after the move holds the old promotion piece, so it goes with the moves after it.
+            self._truncate(i + 1)
+            self._checkpoints.pop(self._first + i + 1, None)
+            self._moves[i] = move
+
+    # clears the mark of a move awaiting its promotion piece, as another move has been played since.
+    def clear_pending(self):
+        self._pending = None
+
+    # returns (move, undo) of the move played before the current ply, and moves the cursor back to undo it.
+    # returns None if there is none held.
+    def back(self):
+        self._pending = None
+        if self._cursor == self._first:
+            return None
+        self._cursor -= 1
+        i = self._cursor - self._first
+        return self._moves[i], self._undo[i]
+
+    # returns the move played from the current ply before it was undone, or None if there is none.
+    def next_move(self):
+        i = self._cursor - self._first
+        if i >= len(self._moves):
+            return None
+        return self._moves[i]
+
+    # moves the cursor to ply, after the board has been restored to its checkpoint.
+    def rewind(self, ply: int):
+        self._pending = None
+        self._cursor = ply
+
+    # discards the moves from index i onwards, along with the checkpoints after them.
+    def _truncate(self, i: int):
+        if i >= len(self._moves):
+            return
+        del self._moves[i:]
+        del self._undo[i:]
+        for ply in [ply for ply in self._checkpoints if ply > self._first + i]:
+            del self._checkpoints[ply]
+
+    # drops the oldest count moves, which can then no longer be undone.
+    def _drop(self, count: int):
+        del self._moves[:count]
+        del self._undo[:count]
+        self._first += count
+        for ply in [ply for ply in self._checkpoints if ply < self._first]:
+            del self._checkpoints[ply]
+
+MOVE_MASK = 0xFFF # source and destination squares of a packed move.
+NO_SQUARE = 0 # stored in place of square + 1 when there is no square.
+
+# returns the square index of position, counting squares from a1 along the ranks. Squares are
+# stored in this form wherever moves or positions are packed.
+def square_index(position: ChessPosition):
+    return position.y_coord * 8 + position.x_coord
+
+# returns the ChessPosition of square index square.
+def square_position(square: int):
+    return ChessPosition(square % 8, square // 8)
+
+# returns a move from square src to square dst packed into an integer. promotion is the promoted
+# piece type's value + 1, or 0 if the move is not a promotion.
+def pack_move(src: int, dst: int, promotion: int = 0):
+    return src | dst << 6 | promotion << 12
+
+# returns (src, dst, promotion) of a packed move.
+def unpack_move(move: int):
+    return move & 0x3F, move >> 6 & 0x3F, move >> 12
+
+# returns the information needed to undo a move packed into an integer: whether the moving piece had
+# moved before, the captured piece's type value + 1 (0 if none), square and moved flag, and the
+# en passant square + 1 before the move (NO_SQUARE if none).
+def pack_undo(moved: bool, captured: int, captured_square: int, captured_moved: bool, enpassant: int):
+    return int(moved) | captured << 1 | captured_square << 4 | int(captured_moved) << 10 | enpassant << 11
+
+# returns (moved, captured, captured square, captured moved, en passant) of packed undo information.
+def unpack_undo(undo: int):
+    return bool(undo & 1), undo >> 1 & 0x7, undo >> 4 & 0x3F, bool(undo >> 10 & 1), undo >> 11 & 0x7F
@@ -20,6 +20,12 @@ class MoveCommand:
         self.src = source
         self.dst = destination
 
+    def __str__(self):
+        return "{} {}".format(self.src, self.dst)
+
+    def __eq__(self, other):
+        return isinstance(other, MoveCommand) and self.src == other.src and self.dst == other.dst
+
     # creates a chess move from a string.
     @staticmethod
     def from_string(string: str):
@@ -18,6 +18,23 @@ class Piece:
     def move(self, destination: ChessPosition):
         self._position = destination
 
+    # places the piece at position without the side effects of move(). Used to undo moves.
+    # moved is ignored by pieces whose moves do not depend on having moved.
+    def restore(self, position: ChessPosition, moved: bool):
+        self._position = position
+
+    # returns an array of all movable positions.
+    def valid_moves(self, board):
+        return list(self.generate_moves(board))
+
+    # returns an array of all attackable positions.
+    def valid_attacks(self, board):
+        return list(self.generate_attacks(board))
+
+    # yields all attackable positions. Unless overridden, a piece attacks every square it can move to.
+    def generate_attacks(self, board):
+        return self.generate_moves(board)
+
 class PieceFactory:
     @staticmethod
     def create(piece_type: PieceType, position: ChessPosition, colour: Colour):
@@ -40,6 +57,8 @@ class PieceFactory:
             return Pawn(position, colour)
 
 class King(Piece):
+    piece_type = PieceType.KING
+
     def __init__(self, position: ChessPosition, colour: Colour):
         super().__init__(position, colour)
         self._moved = False
@@ -54,26 +73,29 @@ class King(Piece):
         self._board_handle = board
         self._board_handle.register_king_position(self.position, self.colour)
 
-    # returns an array of all movable positions.
-    def valid_moves(self, board):
-        standard_squares = ((1,1), (0,1), (-1,1), (-1,0), (-1,-1), (0,-1), (1,-1), (1,0))
+    # yields all movable positions. Castling squares are searched last as they are the most expensive.
+    def generate_moves(self, board):
         castling_directions = ((-1, 0), (1,0))
-        positions = []
-        for square in standard_squares:
-            positions.append(board.square_search(self.position, self.colour, square[0], square[1]))
+        yield from self.generate_attacks(board)
         for dir in castling_directions:
-            positions.append(board.castle_search(self.position, self.colour, dir[0], dir[1]))
-        positions = [position for position in positions if position is not None]
-        return positions
+            position = board.castle_search(self.position, self.colour, dir[0], dir[1])
+            if position is not None:
+                yield position
 
-    # returns an array of all attackable positions.
-    def valid_attacks(self, board):
+    # yields all attackable positions.
+    def generate_attacks(self, board):
         standard_squares = ((1,1), (0,1), (-1,1), (-1,0), (-1,-1), (0,-1), (1,-1), (1,0))
-        positions = []
         for square in standard_squares:
-            positions.append(board.square_search(self.position, self.colour, square[0], square[1]))
-        positions = [position for position in positions if position is not None]
-        return positions
+            position = board.square_search(self.position, self.colour, square[0], square[1])
+            if position is not None:
+                yield position
+
+    # places the king at position with moved state, and registers king position.
+    def restore(self, position: ChessPosition, moved: bool):
+        self._position = position
+        self._moved = moved
+        if self._board_handle is not None:
+            self._board_handle.register_king_position(position, self.colour)
 
     # updates pieces position to destination, updates moved parameter, and registers king position.
     # If the move is a castling move, castles rook.
@@ -93,18 +115,13 @@ class King(Piece):
             return "k"
 
 class Queen(Piece):
+    piece_type = PieceType.QUEEN
 
-    # returns an array of all movable positions.
-    def valid_moves(self, board):
+    # yields all movable positions.
+    def generate_moves(self, board):
         directions = ((1,1), (0,1), (-1,1), (-1,0), (-1,-1), (0,-1), (1,-1), (1,0))
-        positions = []
         for dir in directions:
-            positions += board.direction_search(self.position, self.colour, dir[0], dir[1])
-        return positions
-
-    # returns an array of all attackable positions.
-    def valid_attacks(self, board):
-        return self.valid_moves(board)
+            yield from board.direction_search(self.position, self.colour, dir[0], dir[1])
 
     # returns a character representing the piece.
     def symbol(self):
@@ -114,18 +131,13 @@ class Queen(Piece):
             return "q"
 
 class Bishop(Piece):
+    piece_type = PieceType.BISHOP
 
-    # returns an array of all movable positions.
-    def valid_moves(self, board):
+    # yields all movable positions.
+    def generate_moves(self, board):
         directions = ((1,1), (-1,1), (-1,-1), (1,-1))
-        positions = []
         for dir in directions:
-            positions += board.direction_search(self.position, self.colour, dir[0], dir[1])
-        return positions
-
-    # returns an array of all attackable positions.
-    def valid_attacks(self, board):
-        return self.valid_moves(board)
+            yield from board.direction_search(self.position, self.colour, dir[0], dir[1])
 
     # returns a character representing the piece.
     def symbol(self):
@@ -135,19 +147,15 @@ class Bishop(Piece):
             return "b"
 
 class Knight(Piece):
+    piece_type = PieceType.KNIGHT
 
-    # returns an array of all movable positions.
-    def valid_moves(self, board):
+    # yields all movable positions.
+    def generate_moves(self, board):
         standard_squares = ((1,2), (-1,2), (-2,1), (-2,-1), (-1,-2), (1,-2), (2,-1), (2,1))
-        positions = []
         for square in standard_squares:
-            positions.append(board.square_search(self.position, self.colour, square[0], square[1]))
-        positions = [position for position in positions if position is not None]
-        return positions
-
-    # returns an array of all attackable positions.
-    def valid_attacks(self, board):
-        return self.valid_moves(board)
+            position = board.square_search(self.position, self.colour, square[0], square[1])
+            if position is not None:
+                yield position
 
     # returns a character representing the piece.
     def symbol(self):
@@ -157,6 +165,8 @@ class Knight(Piece):
             return "n"
 
 class Rook(Piece):
+    piece_type = PieceType.ROOK
+
     def __init__(self, position: ChessPosition, colour: Colour):
         super().__init__(position, colour)
         self._moved = False
@@ -165,17 +175,16 @@ class Rook(Piece):
     def moved(self):
         return copy(self._moved)
 
-    # returns an array of all movable positions.
-    def valid_moves(self, board):
+    # yields all movable positions.
+    def generate_moves(self, board):
         directions = ((0,1), (-1,0), (0,-1), (1,0))
-        positions = []
         for dir in directions:
-            positions += board.direction_search(self.position, self.colour, dir[0], dir[1])
-        return positions
+            yield from board.direction_search(self.position, self.colour, dir[0], dir[1])
 
-    # returns an array of all attackable positions.
-    def valid_attacks(self, board):
-        return self.valid_moves(board)
+    # places the rook at position with moved state.
+    def restore(self, position: ChessPosition, moved: bool):
+        self._position = position
+        self._moved = moved
 
     # updates pieces position to destination, and updates moved parameter.
     def move(self, destination: ChessPosition):
@@ -190,6 +199,8 @@ class Rook(Piece):
             return "r"
 
 class Pawn(Piece):
+    piece_type = PieceType.PAWN
+
     def __init__(self, position: ChessPosition, colour: Colour):
         super().__init__(position, colour)
         self._moved = False
@@ -203,28 +214,31 @@ class Pawn(Piece):
     def set_board_handle(self, board):
         self._board_handle = board
 
-    # returns an array of all movable positions.
-    def valid_moves(self, board):
+    # yields all movable positions.
+    def generate_moves(self, board):
         standard_square = (0,1)
         first_move_square = (0,2)
+        position = board.square_search(self._position, self._colour, standard_square[0], standard_square[1] if self._colour==Colour.WHITE else -1 * standard_square[1], passive=True)
+        if position is not None:
+            yield position
+            if self._moved == False:
+                position = board.square_search(self._position, self._colour, first_move_square[0], first_move_square[1] if self._colour==Colour.WHITE else -1 * first_move_square[1], passive=True)
+                if position is not None:
+                    yield position
+        yield from self.generate_attacks(board)
+
+    # yields all attackable positions.
+    def generate_attacks(self, board):
         attacking_squares = ((-1,1), (1,1))
-        positions = []
-        positions.append(board.square_search(self._position, self._colour, standard_square[0], standard_square[1] if self._colour==Colour.WHITE else -1 * standard_square[1], passive=True))
-        if positions[0] is not None and self._moved == False:
-            positions.append(board.square_search(self._position, self._colour, first_move_square[0], first_move_square[1] if self._colour==Colour.WHITE else -1 * first_move_square[1], passive=True))
         for square in attacking_squares:
-            positions.append(board.square_search(self._position, self._colour, square[0], square[1] if self._colour==Colour.WHITE else -1 * square[1], pawn_take=True))
-        positions = [position for position in positions if position is not None]
-        return positions
+            position = board.square_search(self._position, self._colour, square[0], square[1] if self._colour==Colour.WHITE else -1 * square[1], pawn_take=True)
+            if position is not None:
+                yield position
 
-    # returns an array of all attackable positions.
-    def valid_attacks(self, board):
-        attacking_squares = ((-1,1), (1,1))
-        positions = []
-        for square in attacking_squares:
-            positions.append(board.square_search(self._position, self._colour, square[0], square[1] if self._colour==Colour.WHITE else -1 * square[1], pawn_take=True))
-        positions = [position for position in positions if position is not None]
-        return positions
+    # places the pawn at position with moved state.
+    def restore(self, position: ChessPosition, moved: bool):
+        self._position = position
+        self._moved = moved
 
     # updates pieces position to destination, and updates moved parameter.
     # If the move is by 2 squares, updates enpassant parameter on the board.
@@ -0,0 +1,129 @@
+from board import Board
+from move import MoveCommand
+from enumerations import Colour, PieceType, PIECE_VALUES
+from copy import deepcopy
+
+MATE_SCORE = 100000 # score of delivering mate at the root. Mates further away score less.
+DELTA_MARGIN = 200 # captures which cannot raise the score to within this margin of alpha are pruned.
+
+# returns the colour opposite to colour.
+def opposite(colour: Colour):
+    return Colour.BLACK if colour == Colour.WHITE else Colour.WHITE
+
+# returns the material balance of board from the point of view of colour.
+def evaluate(board: Board, colour: Colour):
+    return board.material(colour) - board.material(opposite(colour))
+
+# returns the material won by the side making the capture move once the exchange on its destination
+# square is played out. Both sides recapture with their least valuable attacker, and either side may
+# stop capturing when continuing would lose material. Attackers are recomputed after every capture,
+# so pieces behind the ones exchanged (x-rays) join in.
+def static_exchange(board: Board, move: MoveCommand):
+    board = deepcopy(board)
+    square = move.dst
+    piece = board.get_piece(move.src)
+    victim = board.captured_piece(piece, square)
+    gains = [PIECE_VALUES[victim.piece_type] if victim is not None else 0]
+    on_square = PIECE_VALUES[piece.piece_type]
+    colour = piece.colour
+    board.execute_move(move, register=False)
+
+    while True:
+        colour = opposite(colour)
+        attackers = board.attackers(square, colour)
+        if len(attackers) == 0:
+            break
+        attacker = min(attackers, key=lambda attacker: PIECE_VALUES[attacker.piece_type])
+        gains.append(on_square - gains[-1])
+        on_square = PIECE_VALUES[attacker.piece_type]
+        board.execute_move(MoveCommand(attacker.position, square), register=False)
+
+    while len(gains) > 1:
+        gain = gains.pop()
+        gains[-1] = -max(-gains[-1], gain)
+    return gains[0]
+
+class Search:
+    def __init__(self, tablebase=None):
+        self.nodes = 0 # number of positions visited since construction.
+        self._tablebase = tablebase # Tablebase probed for exact scores of the positions it covers, if given.
+
+    # returns the best MoveCommand for colour found by a depth limited alpha-beta search,
+    # or None if colour has no legal moves.
+    def best_move(self, board: Board, colour: Colour, depth: int):
+        best = None
+        alpha = -MATE_SCORE - 1
+        beta = MATE_SCORE + 1
+        for move in board.generate_moves(colour, legal=True):
+            score = -self.alpha_beta(self._make_move(board, move), opposite(colour), depth - 1, -beta, -alpha, 1)
+            if best is None or score > alpha:
+                alpha = score
+                best = move
+        return best
+
+    # returns the score of board for colour, searching depth plies before dropping into quiescence search.
+    def alpha_beta(self, board: Board, colour: Colour, depth: int, alpha, beta, ply: int):
+        if depth <= 0:
+            return self.quiescence(board, colour, alpha, beta, ply)
+        self.nodes += 1
+        score = self._probe(board, colour, ply)
+        if score is not None:
+            return score
+        has_moves = False
+        for move in board.generate_moves(colour, legal=True):
+            has_moves = True
+            score = -self.alpha_beta(self._make_move(board, move), opposite(colour), depth - 1, -beta, -alpha, ply + 1)
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+        if not has_moves:
+            return -(MATE_SCORE - ply) if board.check(opposite(colour)) else 0
+        return alpha
+
+    # returns the score of board for colour once all profitable captures have been resolved.
+    # captures are skipped if they cannot raise the score near alpha (delta pruning) or if they
+    # lose material on their square (SEE pruning).
+    def quiescence(self, board: Board, colour: Colour, alpha, beta, ply: int = 0):
+        self.nodes += 1
+        score = self._probe(board, colour, ply)
+        if score is not None:
+            return score
+        stand_pat = evaluate(board, colour)
+        if stand_pat >= beta:
+            return beta
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        for move in board.generate_captures(colour):
+            victim = board.captured_piece(board.get_piece(move.src), move.dst)
+            if stand_pat + PIECE_VALUES[victim.piece_type] + DELTA_MARGIN <= alpha:
+                continue
+            if static_exchange(board, move) < 0:
+                continue
+            if board.self_check(move):
+                continue
+            score = -self.quiescence(self._make_move(board, move), opposite(colour), -beta, -alpha, ply + 1)
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    # returns the score of board for colour held in the tablebase, or None if it is not covered.
+    def _probe(self, board: Board, colour: Colour, ply: int):
+        if self._tablebase is None:
+            return None
+        probe = self._tablebase.probe(board, colour)
+        if probe is None:
+            return None
+        result, plies = probe
+        return result * (MATE_SCORE - ply - plies)
+
+    # returns a copy of board with move played. Pawns reaching the last rank are promoted to queens.
+    def _make_move(self, board: Board, move: MoveCommand):
+        board = deepcopy(board)
+        board.execute_move(move, register=False)
+        if board._promote is not None:
+            board.promote(PieceType.QUEEN)
+        return board
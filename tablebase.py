@@ -0,0 +1,358 @@
+from board import Board
+from history import square_index, square_position
+from enumerations import Colour, PieceType
+from array import array
+import mmap
+import os
+import sys
+
+TABLE_DIRECTORY = "tablebases" # directory generated tables are written to and probed from.
+CHUNK_SIZE = 4096 # number of positions solved by a worker process at a time.
+
+# pieces of the strong side besides its king, for every supported material set.
+# tables are generated with white as the strong side, and probed with colours mirrored when black is.
+MATERIALS = {
+    "KQK": (PieceType.QUEEN,),
+    "KRK": (PieceType.ROOK,),
+    "KPK": (PieceType.PAWN,),
+    "KBNK": (PieceType.BISHOP, PieceType.KNIGHT)
+}
+
+# tables probed while generating each material set, for positions reached by promotion.
+DEPENDENCIES = {
+    "KQK": (),
+    "KRK": (),
+    "KPK": ("KQK", "KRK"),
+    "KBNK": ()
+}
+
+LETTERS = {
+    PieceType.QUEEN: "Q",
+    PieceType.ROOK: "R",
+    PieceType.BISHOP: "B",
+    PieceType.KNIGHT: "N",
+    PieceType.PAWN: "P"
+}
+
+# every position is stored as a single byte, from the point of view of the side to move.
+DRAW = 0 # draw, or not yet resolved during generation.
+LOSS = 128 # LOSS + n: the side to move is mated in n plies. Values 1 to 127 mean it mates in that many plies.
+INVALID = 255 # position cannot occur, e.g. overlapping pieces or the side not to move in check, or is stored at another index by symmetry.
+MAX_PLIES = 126 # longest distance to mate which can be stored.
+
+# squares the strong king is mapped onto by symmetry: the a1-d1-d4 triangle for tables without
+# pawns, and the a-d files for tables with pawns, which only have a left/right mirror.
+TRIANGLE = [y * 8 + x for x in range(4) for y in range(x + 1)]
+HALF_BOARD = [y * 8 + x for x in range(4) for y in range(8)]
+
+# symmetries of the board, as functions of x and y.
+SYMMETRIES = [
+    lambda x, y: (x, y),
+    lambda x, y: (7 - x, y),
+    lambda x, y: (x, 7 - y),
+    lambda x, y: (7 - x, 7 - y),
+    lambda x, y: (y, x),
+    lambda x, y: (7 - y, x),
+    lambda x, y: (y, 7 - x),
+    lambda x, y: (7 - y, 7 - x)
+]
+
+# returns the colour opposite to colour.
+def _opposite(colour: Colour):
+    return Colour.BLACK if colour == Colour.WHITE else Colour.WHITE
+
+# returns the path of the table for material in directory.
+def _path(directory: str, material: str):
+    return os.path.join(directory, material + ".tb")
+
+# returns (strong king squares, symmetries) used to index the table for material.
+def _symmetry(material: str):
+    if PieceType.PAWN in MATERIALS[material]:
+        return HALF_BOARD, SYMMETRIES[:2]
+    return TRIANGLE, SYMMETRIES
+
+# slot of each strong king square in the index, for every material set.
+KING_SLOTS = {material: {square: slot for slot, square in enumerate(_symmetry(material)[0])} for material in MATERIALS}
+
+# returns the number of positions in the table for material.
+def table_size(material: str):
+    return 2 * len(_symmetry(material)[0]) * 64 ** (1 + len(MATERIALS[material]))
+
+# returns the index of the position with the strong side to move if strong_to_move, and squares holding
+# the strong king, the weak king, then the strong side's pieces in MATERIALS order, with white as the strong side.
+# the index is addressed by side to move, strong king slot, weak king, then the strong side's pieces.
+# of the symmetric positions putting the strong king on a table square, the one with the smallest index is used.
+def _index(material: str, strong_to_move: bool, squares: list):
+    king_squares, symmetries = _symmetry(material)
+    slots = KING_SLOTS[material]
+    best = None
+    for symmetry in symmetries:
+        mapped = [symmetry(square % 8, square // 8) for square in squares]
+        king = mapped[0][1] * 8 + mapped[0][0]
+        if king not in slots:
+            continue
+        index = (0 if strong_to_move else 1) * len(king_squares) + slots[king]
+        for x, y in mapped[1:]:
+            index = index * 64 + y * 8 + x
+        if best is None or index < best:
+            best = index
+    return best
+
+# returns (strong side to move, squares) of index in the table for material, the inverse of _index.
+def _decode(material: str, index: int):
+    squares = []
+    for _ in range(1 + len(MATERIALS[material])):
+        squares.append(index % 64)
+        index //= 64
+    squares.reverse()
+    king_squares = _symmetry(material)[0]
+    squares.insert(0, king_squares[index % len(king_squares)])
+    return index // len(king_squares) == 0, squares
+
+# returns (material, index) of board with colour to move if it is covered by a table. returns (None, None) otherwise.
+def position_index(board: Board, colour: Colour):
+    kings = {}
+    extras = {Colour.WHITE: [], Colour.BLACK: []}
+    for type, piece_colour, position in board.placement():
+        if type == PieceType.KING:
+            kings[piece_colour] = position
+        else:
+            extras[piece_colour].append((type, position))
+
+    for strong in (Colour.WHITE, Colour.BLACK):
+        weak = _opposite(strong)
+        if len(extras[weak]) > 0:
+            continue
+        pieces = sorted(extras[strong], key=lambda piece: list(LETTERS).index(piece[0]))
+        material = "K" + "".join(LETTERS[piece[0]] for piece in pieces) + "K"
+        if material not in MATERIALS:
+            return None, None
+
+        squares = []
+        for position in [kings[strong], kings[weak]] + [piece[1] for piece in pieces]:
+            y = position.y_coord if strong == Colour.WHITE else 7 - position.y_coord
+            squares.append(y * 8 + position.x_coord)
+        return material, _index(material, colour == strong, squares)
+    return None, None
+
+# returns a Board holding pieces, given as (type, colour, square), with kings unable to castle and
+# white pawns able to double step from their second rank.
+def _create_board(pieces: list):
+    board = Board([])
+    for type, colour, square in pieces:
+        moved = type != PieceType.PAWN or square // 8 != 1
+        board.add_piece(type, square_position(square), colour, moved=moved)
+    return board
+
+# returns the pieces, as (type, colour, square), of the position with squares in the table for material.
+def _pieces(material: str, squares: list):
+    pieces = [(PieceType.KING, Colour.WHITE, squares[0]), (PieceType.KING, Colour.BLACK, squares[1])]
+    for type, square in zip(MATERIALS[material], squares[2:]):
+        pieces.append((type, Colour.WHITE, square))
+    return pieces
+
+# returns (board, colour to move) for index in the table for material, with white as the strong side.
+# returns None if the index does not describe a legal position.
+def create_position(material: str, index: int):
+    strong_to_move, squares = _decode(material, index)
+    colour = Colour.WHITE if strong_to_move else Colour.BLACK
+
+    if len(set(squares)) != len(squares):
+        return None
+    if abs(squares[0] % 8 - squares[1] % 8) <= 1 and abs(squares[0] // 8 - squares[1] // 8) <= 1:
+        return None
+    for type, square in zip(MATERIALS[material], squares[2:]):
+        if type == PieceType.PAWN and (square // 8 == 0 or square // 8 == 7):
+            return None
+
+    board = _create_board(_pieces(material, squares))
+    if board.check(colour):
+        return None
+    return board, colour
+
+# solves the positions of material in [start, stop) one ply deep. Indices which are not the one used
+# for their position by symmetry are skipped, like illegal positions.
+# returns a list of (index, in check, number of distinct successors in the same table, values of
+# successors in other tables).
+def _solve_chunk(arguments):
+    material, start, stop, directory = arguments
+    tablebase = Tablebase(directory)
+    results = []
+    for index in range(start, stop):
+        position = create_position(material, index)
+        if position is None:
+            continue
+        strong_to_move, squares = _decode(material, index)
+        if _index(material, strong_to_move, squares) != index:
+            continue
+        board, colour = position
+        pieces = _pieces(material, squares)
+        children = set()
+        external = bytearray()
+        for i, (type, piece_colour, square) in enumerate(pieces):
+            if piece_colour != colour:
+                continue
+            piece = board.get_piece(square_position(square))
+            for dst in piece.generate_moves(board):
+                target = square_index(dst)
+                others = [other for j, other in enumerate(pieces) if j != i and other[2] != target]
+                captured = len(others) < len(pieces) - 1
+                types = [type]
+                if type == PieceType.PAWN and target // 8 == 7:
+                    types = [PieceType.QUEEN, PieceType.ROOK]
+                for new_type in types:
+                    child = _create_board(others + [(new_type, piece_colour, target)])
+                    if child.check(_opposite(colour)): # moved into check.
+                        continue
+                    if captured or new_type != type:
+                        value = tablebase.probe_value(child, _opposite(colour))
+                        external.append(DRAW if value is None else value)
+                    else:
+                        child_squares = list(squares)
+                        child_squares[i] = target
+                        children.add(_index(material, not strong_to_move, child_squares))
+        results.append((index, board.check(_opposite(colour)), len(children), external))
+    return results
+
+# returns the indices of the positions with a move to any of the positions of material at indices,
+# found by taking back the moves of the side not to move. Each position's predecessors are listed
+# once, though they may repeat across positions. Indices of illegal positions are included.
+def _unmove_chunk(arguments):
+    material, indices = arguments
+    predecessors = array("I")
+    for index in indices:
+        strong_to_move, squares = _decode(material, index)
+        board, colour = create_position(material, index)
+        found = set()
+        for i, (type, piece_colour, square) in enumerate(_pieces(material, squares)):
+            if piece_colour == colour:
+                continue
+            if type == PieceType.PAWN:
+                origins = []
+                if board.get_piece(square_position(square - 8)) is None:
+                    origins.append(square - 8)
+                    if square // 8 == 3 and board.get_piece(square_position(square - 16)) is None:
+                        origins.append(square - 16)
+            else:
+                piece = board.get_piece(square_position(square))
+                origins = [square_index(dst) for dst in piece.generate_moves(board)
+                           if board.get_piece(dst) is None]
+            for origin in origins:
+                previous = list(squares)
+                previous[i] = origin
+                found.add(_index(material, not strong_to_move, previous))
+        predecessors.extend(found)
+    return predecessors
+
+# yields the predecessors of the positions of material at indices, taking back moves across the pool.
+def _predecessors(pool, material: str, indices):
+    chunks = [(material, indices[start:start + CHUNK_SIZE]) for start in range(0, len(indices), CHUNK_SIZE)]
+    for predecessors in pool.imap_unordered(_unmove_chunk, chunks):
+        yield from predecessors
+
+# generates the table for material by retrograde analysis and writes it to directory.
+# positions are solved one ply deep in parallel across processes, counting their successors. Results
+# are then propagated backwards from the mates one ply at a time, so every position gets its shortest
+# distance to mate: the predecessors of the positions resolved at each ply are found by taking back
+# moves, so the move graph is never held in memory.
+# tables material depends on are generated first if they do not exist.
+def generate(material: str, directory: str = TABLE_DIRECTORY, processes: int = None):
+    from multiprocessing import Pool # imported here, as processes which only probe never need it.
+
+    for dependency in DEPENDENCIES[material]:
+        if not os.path.exists(_path(directory, dependency)):
+            generate(dependency, directory, processes)
+
+    size = table_size(material)
+    values = bytearray([INVALID]) * size
+    remaining = array("H", bytes(2 * size)) # number of successors not yet known to win for the opponent.
+    external_wins = [array("I") for _ in range(MAX_PLIES + 1)] # positions with a successor in another table won in n plies.
+    external_losses = [array("I") for _ in range(MAX_PLIES + 1)] # positions with a successor in another table lost in n plies.
+    lost = array("I") # positions lost in the number of plies being propagated.
+    won = array("I") # positions won in the number of plies being propagated.
+
+    chunks = [(material, start, min(start + CHUNK_SIZE, size), directory) for start in range(0, size, CHUNK_SIZE)]
+    with Pool(processes) as pool:
+        for results in pool.imap_unordered(_solve_chunk, chunks):
+            for index, in_check, children, external in results:
+                values[index] = DRAW
+                remaining[index] = children + len(external)
+                if remaining[index] == 0 and in_check:
+                    values[index] = LOSS
+                    lost.append(index)
+                for value in external:
+                    if 0 < value < LOSS:
+                        external_wins[value].append(index)
+                    elif LOSS <= value < INVALID:
+                        external_losses[value - LOSS].append(index)
+
+        for plies in range(MAX_PLIES):
+            next_won = array("I")
+            next_lost = array("I")
+            for predecessors in (external_losses[plies], _predecessors(pool, material, lost)):
+                for index in predecessors:
+                    if values[index] == DRAW:
+                        values[index] = plies + 1
+                        next_won.append(index)
+            for predecessors in (external_wins[plies], _predecessors(pool, material, won)):
+                for index in predecessors:
+                    if values[index] == DRAW:
+                        remaining[index] -= 1
+                        if remaining[index] == 0:
+                            values[index] = LOSS + plies + 1
+                            next_lost.append(index)
+            won = next_won
+            lost = next_lost
+            if len(won) == 0 and len(lost) == 0 and not any(external_wins[plies + 1:] + external_losses[plies + 1:]):
+                break
+
+    os.makedirs(directory, exist_ok=True)
+    with open(_path(directory, material), "wb") as file:
+        file.write(values)
+
+class Tablebase:
+    def __init__(self, directory: str = TABLE_DIRECTORY):
+        self._directory = directory
+        self._tables = {} # memory mapped tables by material, opened on first probe. None if not generated.
+
+    # returns (result, plies) for colour to move on board, where result is 1 if colour mates in plies,
+    # -1 if colour is mated in plies, and 0 for a draw.
+    # returns None if the position is not covered by a generated table.
+    def probe(self, board: Board, colour: Colour):
+        value = self.probe_value(board, colour)
+        if value is None or value == INVALID:
+            return None
+        if value == DRAW:
+            return 0, 0
+        if value < LOSS:
+            return 1, value
+        return -1, value - LOSS
+
+    # returns the stored value for colour to move on board, or None if it is not covered by a generated table.
+    def probe_value(self, board: Board, colour: Colour):
+        material, index = position_index(board, colour)
+        if material is None:
+            return None
+        table = self._table(material)
+        if table is None:
+            return None
+        return table[index]
+
+    # returns the memory mapped table for material, or None if it has not been generated.
+    def _table(self, material: str):
+        if material not in self._tables:
+            path = _path(self._directory, material)
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    self._tables[material] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._tables[material] = None
+        return self._tables[material]
+
+# generates the tables for the material sets given on the command line, e.g. python tablebase.py KQK KRK
+def main():
+    for material in sys.argv[1:]:
+        generate(material)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from board import Board
+from move import ChessPosition, MoveCommand
+from enumerations import Colour, PieceType
+from search import Search
+import time
+
+SYMBOLS = {
+    "K": PieceType.KING,
+    "Q": PieceType.QUEEN,
+    "R": PieceType.ROOK,
+    "B": PieceType.BISHOP,
+    "N": PieceType.KNIGHT,
+    "P": PieceType.PAWN
+}
+
+# (name, pieces, side to move, search depth, best move).
+# pieces are written as symbol and square, upper case for white and lower case for black.
+POSITIONS = [
+    ("win hanging queen", "Kg1 Ra1 kg8 qa8 pf7 pg7 ph7", Colour.WHITE, 1, "a1 a8"),
+    ("most valuable victim", "Ke1 Nd4 ke8 rb5 bf5", Colour.WHITE, 1, "d4 b5"),
+    ("avoid defended pawn", "Kg1 Qd1 Ra1 kg8 rd8 pd5 na5", Colour.WHITE, 1, "a1 a5"),
+    ("back rank mate", "Kg1 Ra1 kg8 pf7 pg7 ph7", Colour.WHITE, 2, "a1 a8"),
+    ("promote pawn", "Kh1 Pb7 kh8 ph7", Colour.WHITE, 1, "b7 b8"),
+    ("recapture with pawn", "Kg1 Pc2 Rd1 kg8 bd3 rd8", Colour.WHITE, 1, "c2 d3"),
+    ("black wins rook", "Kh1 Ra4 kh8 bd7 pg7", Colour.BLACK, 1, "d7 a4"),
+]
+
+# returns a Board set up with the pieces described by string.
+def create_board(string: str):
+    board = Board([])
+    for token in string.split(" "):
+        colour = Colour.WHITE if token[0].isupper() else Colour.BLACK
+        board.add_piece(SYMBOLS[token[0].upper()], ChessPosition.from_string(token[1:]), colour, moved=True)
+    return board
+
+# searches every position in POSITIONS and prints the solve rate and nodes searched per position.
+def main():
+    solved = 0
+    total_nodes = 0
+    start = time.perf_counter()
+    for name, pieces, colour, depth, best in POSITIONS:
+        search = Search()
+        move = search.best_move(create_board(pieces), colour, depth)
+        success = move == MoveCommand.from_string(best)
+        solved += success
+        total_nodes += search.nodes
+        print("{:<24} {:<8} {:>8} nodes  {}".format(name, "solved" if success else "failed", search.nodes, move))
+    elapsed = time.perf_counter() - start
+    print("Solved {}/{} ({:.0%}), {:.0f} nodes per position, {:.0f} nodes/s".format(
+        solved, len(POSITIONS), solved / len(POSITIONS), total_nodes / len(POSITIONS), total_nodes / elapsed))
+
+if __name__ == "__main__":
+    main()
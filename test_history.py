@@ -0,0 +1,74 @@
+from board import Board
+from move import MoveCommand
+from enumerations import PieceType
+import unittest
+
+# white castles, captures en passant on d6, and black promotes on a1 while white promotes on d8.
+MOVES = ["e2 e4", "a7 a6", "e4 e5", "d7 d5", "e5 d6", "a6 a5", "g1 f3", "a5 a4", "f1 e2", "a4 a3",
+         "e1 g1", "a3 b2", "d6 c7", "b2 a1", "c7 d8", "e8 d8", "d1 e1"]
+PROMOTION_PLY = 13 # ply of the position before black's promotion on a1.
+
+# returns the pieces of board as (type, colour, x, y, moved), sorted, and its en passant square.
+def state(board: Board):
+    pieces = sorted((piece.piece_type.value, piece.colour.value, piece.position.x_coord, piece.position.y_coord,
+                     getattr(piece, "moved", False)) for piece in board.pieces)
+    return pieces, str(board._enpassant)
+
+# plays moves on board, promoting pawns to promotion, and returns the state after each of them.
+def play(board: Board, moves: list, promotion: PieceType):
+    states = []
+    for string in moves:
+        board.execute_move(MoveCommand.from_string(string))
+        if board._promote is not None:
+            board.promote(promotion)
+        states.append(state(board))
+    return states
+
+class HistoryTest(unittest.TestCase):
+    # plays MOVES, then replays black's promotion with another piece, and checks every ply is restored
+    # as it was when last reached by undo, redo and seek.
+    def check_round_trip(self, checkpoint_interval: int):
+        board = Board(checkpoint_interval=checkpoint_interval)
+        states = [state(board)] + play(board, MOVES, PieceType.KNIGHT)
+
+        self.assertTrue(board.seek(PROMOTION_PLY))
+        knight = states[PROMOTION_PLY + 1]
+        states[PROMOTION_PLY + 1:] = play(board, MOVES[PROMOTION_PLY:], PieceType.QUEEN)
+        self.assertNotEqual(states[PROMOTION_PLY + 1], knight)
+
+        for ply in reversed(range(len(MOVES))):
+            self.assertTrue(board.undo())
+            self.assertEqual(state(board), states[ply], ply)
+        self.assertFalse(board.undo())
+        for ply in range(1, len(MOVES) + 1):
+            self.assertTrue(board.redo())
+            self.assertEqual(state(board), states[ply], ply)
+        self.assertFalse(board.redo())
+        for start in range(len(MOVES) + 1):
+            for ply in range(len(MOVES) + 1):
+                self.assertTrue(board.seek(start))
+                self.assertTrue(board.seek(ply))
+                self.assertEqual(board.ply, ply)
+                self.assertEqual(state(board), states[ply], (start, ply))
+
+    def test_round_trip(self):
+        for checkpoint_interval in (1, 4, 32):
+            with self.subTest(checkpoint_interval=checkpoint_interval):
+                self.check_round_trip(checkpoint_interval)
+
+    # checks a capped history drops its oldest moves and snapshots, and can still seek to the ones it holds.
+    def test_max_plies(self):
+        board = Board(max_plies=20, checkpoint_interval=8)
+        states = [state(board)] + play(board, ["g1 f3", "g8 f6", "f3 g1", "f6 g8"] * 50, PieceType.QUEEN)
+        history = board._history
+        self.assertEqual(history.last_ply, 200)
+        self.assertGreater(history.first_ply, 0)
+        self.assertLess(history.last_ply - history.first_ply, 20 + 8)
+        self.assertLessEqual(len(history._checkpoints), (20 + 8) // 8 + 1)
+        self.assertFalse(board.seek(history.first_ply - 1))
+        for ply in range(history.first_ply, history.last_ply + 1):
+            self.assertTrue(board.seek(ply))
+            self.assertEqual(state(board), states[ply], ply)
+
+if __name__ == "__main__":
+    unittest.main()
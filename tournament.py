@@ -0,0 +1,204 @@
+from game import Game
+from move import MoveCommand
+from search import Search
+from tablebase import Tablebase
+from workers import create_pool
+from enumerations import Colour, State
+import json
+import math
+import os
+import sys
+import time
+
+# opening lines every pairing plays from both sides. moves are separated by commas.
+OPENINGS = [
+    "e2 e4,e7 e5",
+    "d2 d4,d7 d5",
+    "e2 e4,c7 c5",
+    "d2 d4,g8 f6",
+    "c2 c4,e7 e5",
+    "g1 f3,d7 d5",
+    "e2 e4,e7 e6",
+    "e2 e4,c7 c6"
+]
+
+PRIOR = 0.5 # games of each result added to a match's results when estimating its score.
+
+class Engine:
+    def __init__(self, name: str, depth: int, use_tablebase=False):
+        self.name = name
+        self.depth = depth # search depth in plies.
+        self.use_tablebase = use_tablebase # whether the search probes the tournament's tablebase.
+
+# returns the expected score of a player rated elo above its opponent.
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+# returns the Elo difference at which expected_score is score.
+def elo(score):
+    if score <= 0 or score >= 1:
+        return math.copysign(math.inf, score - 0.5)
+    return -400 * math.log10(1 / score - 1)
+
+# returns the mean and variance of the score per game of results, which are scores of 1, 0.5 or 0 per game.
+# the scores are taken as a trinomial of wins, draws and losses, with PRIOR games of each added so neither
+# the mean reaches 0 or 1 nor the variance 0, however one sided or drawn the results.
+def _moments(results):
+    wins = results.count(1.0) + PRIOR
+    draws = results.count(0.5) + PRIOR
+    losses = results.count(0.0) + PRIOR
+    games = wins + draws + losses
+    mean = (wins + draws / 2) / games
+    variance = (wins * (1 - mean) ** 2 + draws * (0.5 - mean) ** 2 + losses * mean ** 2) / games
+    return mean, variance
+
+# returns (Elo difference, 95% error margin) of a player with results.
+# when the confidence interval of the score reaches 0 or 1 on one side, the margin of the other side is used.
+# it is infinite when it reaches both, e.g. after a handful of games.
+def elo_difference(results):
+    if len(results) == 0:
+        return 0.0, math.inf
+    score, variance = _moments(results)
+    margin = 1.96 * math.sqrt(variance / len(results))
+    upper = score + margin
+    lower = score - margin
+    if upper >= 1 and lower <= 0:
+        return elo(score), math.inf
+    if upper >= 1:
+        return elo(score), elo(score) - elo(lower)
+    if lower <= 0:
+        return elo(score), elo(upper) - elo(score)
+    return elo(score), (elo(upper) - elo(lower)) / 2
+
+# returns (log likelihood ratio, lower bound, upper bound) of a sequential probability ratio test of
+# the hypothesis elo1 against elo0, for a player with results.
+# the test accepts elo1 once the ratio reaches the upper bound, and elo0 once it reaches the lower one.
+def sprt(results, elo0=0, elo1=5, alpha=0.05, beta=0.05):
+    lower = math.log(beta / (1 - alpha))
+    upper = math.log((1 - beta) / alpha)
+    if len(results) == 0:
+        return 0.0, lower, upper
+    score, variance = _moments(results)
+    s0 = expected_score(elo0)
+    s1 = expected_score(elo1)
+    llr = (s1 - s0) * (2 * score - s0 - s1) * len(results) / (2 * variance)
+    return llr, lower, upper
+
+# plays a game between two engines from an opening, and returns a record of its result.
+# task is (game id, white Engine, black Engine, opening, plies before a draw, tablebase directory or None).
+def play_game(task):
+    game_id, white, black, opening, draw_after_plies, tablebase_directory = task
+    start = time.perf_counter()
+    tablebase = Tablebase(tablebase_directory) if tablebase_directory is not None else None
+    game = Game(tablebase=tablebase, draw_after_plies=draw_after_plies)
+    for string in opening.split(","):
+        game.play(MoveCommand.from_string(string))
+
+    nodes = 0
+    while not game.finished:
+        engine = white if game.colour_to_move() == Colour.WHITE else black
+        search = Search(tablebase if engine.use_tablebase else None)
+        move = search.best_move(game.board, game.colour_to_move(), engine.depth)
+        nodes += search.nodes
+        if not game.play(move):
+            raise RuntimeError("Engine {} played an invalid move {}".format(engine.name, move))
+
+    if game.state in (State.WHITE_CHECKMATE, State.WHITE_WIN):
+        result = 1.0
+    elif game.state in (State.BLACK_CHECKMATE, State.BLACK_WIN):
+        result = 0.0
+    else:
+        result = 0.5
+    return {
+        "id": game_id,
+        "white": white.name,
+        "black": black.name,
+        "opening": opening,
+        "result": result,
+        "state": game.state.name,
+        "plies": game.plies,
+        "nodes": nodes,
+        "seconds": time.perf_counter() - start
+    }
+
+# returns the tasks of a tournament in which every pair of engines plays every opening from both sides, rounds times.
+def schedule(engines: list, openings: list, rounds: int, draw_after_plies: int, tablebase_directory: str = None):
+    tasks = []
+    for round in range(rounds):
+        for i, first in enumerate(engines):
+            for second in engines[i + 1:]:
+                for j, opening in enumerate(openings):
+                    for white, black in ((first, second), (second, first)):
+                        game_id = "{}:{}:{}:{}".format(round, j, white.name, black.name)
+                        tasks.append((game_id, white, black, opening, draw_after_plies, tablebase_directory))
+    return tasks
+
+# returns the records previously written to path, so an interrupted tournament can be resumed.
+def load_records(path: str):
+    records = []
+    if os.path.exists(path):
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    records.append(json.loads(line))
+    return records
+
+# returns the results of first against second in records, as scores of 1, 0.5 or 0 per game for first.
+def pair_results(records: list, first: str, second: str):
+    results = []
+    for record in records:
+        if record["white"] == first and record["black"] == second:
+            results.append(record["result"])
+        elif record["white"] == second and record["black"] == first:
+            results.append(1 - record["result"])
+    return results
+
+# returns a report of the match statistics of every pairing in records, and of the throughput of the
+# last games_played records, played over elapsed seconds of wall-clock time.
+def report(records: list, engines: list, elapsed: float, games_played: int, elo0=0, elo1=5):
+    lines = []
+    for i, first in enumerate(engines):
+        for second in engines[i + 1:]:
+            results = pair_results(records, first.name, second.name)
+            difference, margin = elo_difference(results)
+            llr, lower, upper = sprt(results, elo0, elo1)
+            lines.append("{} vs {}: +{} ={} -{}  Elo {:+.1f} +/- {:.1f}  LLR {:.2f} ({:.2f}, {:.2f})".format(
+                first.name, second.name, results.count(1.0), results.count(0.5), results.count(0.0),
+                difference, margin, llr, lower, upper))
+    nodes = sum(record["nodes"] for record in records[len(records) - games_played:])
+    lines.append("{} games, {:.3f} games/s, {:.0f} nodes/s".format(
+        len(records), games_played / elapsed if elapsed > 0 else 0.0, nodes / elapsed if elapsed > 0 else 0.0))
+    return "\n".join(lines)
+
+# plays a tournament between engines in a process pool, streaming a record of every game to path.
+# games already recorded in path are not replayed. A match between two engines stops early once
+# the SPRT of elo1 against elo0 has accepted either hypothesis. returns all records.
+def run(engines: list, path: str, openings: list = OPENINGS, rounds=1, draw_after_plies=200, processes: int = None,
+        tablebase_directory: str = None, elo0=0, elo1=5):
+    records = load_records(path)
+    done = set(record["id"] for record in records)
+    tasks = [task for task in schedule(engines, openings, rounds, draw_after_plies, tablebase_directory) if task[0] not in done]
+
+    start = time.perf_counter()
+    games_played = 0
+    with create_pool(processes) as pool, open(path, "a") as file:
+        for record in pool.imap_unordered(play_game, tasks):
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            records.append(record)
+            games_played += 1
+            if len(engines) == 2:
+                llr, lower, upper = sprt(pair_results(records, engines[0].name, engines[1].name), elo0, elo1)
+                if llr <= lower or llr >= upper:
+                    break
+    print(report(records, engines, time.perf_counter() - start, games_played, elo0, elo1))
+    return records
+
+# plays a match between a depth 1 and a depth 2 engine, recording games to the file given on the
+# command line, e.g. python tournament.py results.jsonl
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "tournament.jsonl"
+    run([Engine("depth2", 2), Engine("depth1", 1)], path)
+
+if __name__ == "__main__":
+    main()
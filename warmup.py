@@ -0,0 +1,4 @@
+# preloaded by the worker fork server, see workers.create_pool.
+from workers import warm
+
+warm()
@@ -0,0 +1,39 @@
+from board import Board
+from enumerations import Colour
+import multiprocessing
+import os
+import sys
+import zobrist
+
+# modules imported by the fork server before it forks any worker. warmup builds the lazily
+# initialized tables, so every worker forked from the server shares them copy-on-write.
+PRELOAD = ["board", "game", "search", "tablebase", "warmup"]
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__)) # directory the preloaded modules are imported from.
+
+# builds the tables which are otherwise built on first use.
+def warm():
+    zobrist.keys()
+    Board().zobrist_key(Colour.WHITE)
+
+# returns True if the tables built by warm have been built in this process.
+def is_warm():
+    return zobrist._keys is not None and "board" in sys.modules
+
+# returns a process pool whose workers are forked from a fork server holding warmed tables,
+# so starting a worker costs neither imports nor table construction.
+# the fork server imports PRELOAD with the path it was started with rather than this process's sys.path,
+# and ignores modules it fails to import, so the package directory is passed to it through PYTHONPATH.
+# falls back to a pool warming each worker on start where the fork server is not available, or has
+# been started elsewhere without the package on its path.
+def create_pool(processes: int = None):
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        paths = os.environ.get("PYTHONPATH", "").split(os.pathsep)
+        if PACKAGE_DIRECTORY not in paths:
+            os.environ["PYTHONPATH"] = os.pathsep.join([PACKAGE_DIRECTORY] + [path for path in paths if path])
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(PRELOAD)
+        pool = context.Pool(processes)
+        if pool.apply(is_warm):
+            return pool
+        pool.terminate()
+    return multiprocessing.Pool(processes, initializer=warm)
@@ -0,0 +1,26 @@
+from array import array
+
+SEED = 20240611 # keys are generated from a fixed seed, so position keys are stable across processes and runs.
+SIDE_KEY = 12 * 64 # index of the key xored in when black is to move.
+ENPASSANT_KEYS = SIDE_KEY + 1 # index of the first of 8 keys, one per file of a pawn capturable en passant.
+CASTLING_KEYS = ENPASSANT_KEYS + 8 # index of the first of 4 keys, one per castling right, see castling_key_index.
+KEY_COUNT = CASTLING_KEYS + 4
+
+_keys = None # table of random 64 bit keys, built on first use.
+
+# returns the table of keys, building it on first use.
+def keys():
+    global _keys
+    if _keys is None:
+        import random
+        generator = random.Random(SEED)
+        _keys = array("Q", (generator.getrandbits(64) for _ in range(KEY_COUNT)))
+    return _keys
+
+# returns the index of the key for a piece of type and colour on the square at x, y.
+def piece_key_index(type, colour, x, y):
+    return ((colour.value * 6 + type.value) * 64) + y * 8 + x
+
+# returns the index of the key for colour's right to castle with the rook on file x.
+def castling_key_index(colour, x):
+    return CASTLING_KEYS + colour.value * 2 + (1 if x > 0 else 0)